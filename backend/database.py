@@ -1,20 +1,16 @@
 import sqlite3
 import json
+import threading
 from typing import Optional
 from pathlib import Path
+from .search import register_functions, init_trigram_index, drop_trigram_index
 
 class Database:
     def __init__(self, db_path: Optional[str] = None):
+        config = self.read_config()
         if db_path is None:
             # 尝试从配置文件读取db_path
-            config_path = Path.home() / "AppData" / "Local" / "BHB" / "config.json"
-            if config_path.exists():
-                try:
-                    with open(config_path, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                        db_path = config.get("db_path")
-                except Exception:
-                    pass
+            db_path = config.get("db_path")
             
             # 如果配置文件中没有db_path，使用默认路径
             if db_path is None:
@@ -23,10 +19,28 @@ class Database:
                 db_path = str(app_data_dir / "history.db")
         
         self.db_path = db_path
-        # 持久连接（可选），初始化为 None，按需创建
-        self._conn: Optional[sqlite3.Connection] = None
+        # 三元组搜索索引需在配置中显式开启：索引会写入用户的数据库文件，体积约为历史表的数倍
+        self.search_index_enabled = config.get("search_index_enabled", False) is True
+        # 每个线程一个持久连接，按需创建。连接不能跨线程共享：
+        # 注册了 Python 自定义函数后，两个线程同时使用同一连接可能因 GIL 与 SQLite 互斥锁互相等待而死锁
+        if not hasattr(self, '_local'):
+            self._local = threading.local()
+            # 每次 close() 递增，各线程发现代数变化后自行关闭旧连接
+            self._generation = 0
         self.init_database()
     
+    @staticmethod
+    def read_config() -> dict:
+        """读取配置文件，不存在或无法解析时返回空字典"""
+        config_path = Path.home() / "AppData" / "Local" / "BHB" / "config.json"
+        if config_path.exists():
+            try:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
     def init_database(self):
         """初始化数据库表结构"""
         conn = self.get_connection()
@@ -46,15 +60,45 @@ class Database:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_last_visited_time ON navigation_history(last_visited_time)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_num_visits ON navigation_history(num_visits)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_title ON navigation_history(title)")
+
+        # 模糊/正则搜索使用的三元组倒排索引；关闭时删除已有索引，避免使用不再维护的过期数据
+        if self.search_index_enabled:
+            init_trigram_index(conn)
+        else:
+            drop_trigram_index(conn)
         
         conn.commit()
+
+        # WAL 模式下读操作不会被后台写入阻塞
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error:
+            pass
     
     def get_connection(self):
-        """获取数据库连接"""
-        if self._conn is None:
-            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self._conn.row_factory = sqlite3.Row
-        return self._conn
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.generation != self._generation:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            conn = None
+        if conn is None:
+            conn = self.open_connection()
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+
+    def open_connection(self, busy_timeout_ms: int = 5000) -> sqlite3.Connection:
+        """打开一个独立的新连接（供后台任务使用，调用方负责关闭）"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        # 让 INSERT OR REPLACE 删除旧行时也触发删除触发器，三元组索引才能清理旧 rowid
+        conn.execute("PRAGMA recursive_triggers = ON")
+        register_functions(conn)
+        return conn
     
     def execute_query(self, query: str, params: tuple = ()):
         """执行查询并返回结果"""
@@ -73,17 +117,15 @@ class Database:
         return cursor.rowcount
 
     def close(self):
-        """关闭持久连接（如果存在）。安全可重复调用。"""
-        try:
-            if getattr(self, '_conn', None):
-                try:
-                    self._conn.close()
-                except Exception:
-                    pass
-                self._conn = None
-        except Exception:
-            # noop
-            self._conn = None
+        """关闭当前线程的持久连接，并使其他线程的连接在下次使用时重建。安全可重复调用。"""
+        self._generation += 1
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._local.conn = None
 
     def reinit(self, db_path: Optional[str] = None):
         """安全地重新初始化数据库：先关闭现有连接，再设置新路径并初始化表结构。"""
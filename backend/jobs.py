@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+from .models import JobStatus
+
+class JobCancelled(Exception):
+    """任务被用户取消"""
+
+class Job:
+    """后台长任务：在独立线程中运行并记录进度"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = "pending"
+        self.message: Optional[str] = None
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.rows_processed = 0
+        self.rows_total: Optional[int] = None
+        self.bytes_done = 0
+        self.bytes_total: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        """在工作循环中周期调用，收到取消请求时抛出 JobCancelled"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def to_status(self) -> JobStatus:
+        elapsed = None
+        throughput = None
+        eta = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        if elapsed and elapsed > 0:
+            # 优先按字节计算吞吐；没有字节进度时按行（文件）数计算
+            if self.bytes_total:
+                throughput = self.bytes_done / elapsed
+                if throughput > 0 and not self.finished:
+                    eta = max(0.0, (self.bytes_total - self.bytes_done) / throughput)
+            elif self.rows_total:
+                rate = self.rows_processed / elapsed
+                if rate > 0 and not self.finished:
+                    eta = max(0.0, (self.rows_total - self.rows_processed) / rate)
+
+        return JobStatus(
+            id=self.id,
+            kind=self.kind,
+            status=self.status,
+            message=self.message,
+            error=self.error,
+            result=self.result,
+            rows_processed=self.rows_processed,
+            rows_total=self.rows_total,
+            bytes_done=self.bytes_done,
+            bytes_total=self.bytes_total,
+            elapsed=round(elapsed, 2) if elapsed is not None else None,
+            throughput=round(throughput, 1) if throughput is not None else None,
+            eta=round(eta, 1) if eta is not None else None
+        )
+
+class JobManager:
+    """管理后台任务的创建、查询与取消"""
+
+    # 保留的已结束任务数量上限
+    max_finished_jobs: int = 50
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, kind: str, func: Callable[[Job], dict]) -> Job:
+        """创建任务并在后台线程中执行 func(job)，其返回值作为任务结果"""
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        thread = threading.Thread(target=self._run, args=(job, func), name=f"job-{job.id}", daemon=True)
+        thread.start()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> Dict[str, Job]:
+        with self._lock:
+            return dict(self._jobs)
+
+    def has_active(self, kind: str) -> bool:
+        """是否存在指定类型且尚未结束的任务"""
+        with self._lock:
+            return any(job.kind == kind and not job.finished for job in self._jobs.values())
+
+    def _run(self, job: Job, func: Callable[[Job], dict]):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = func(job)
+            job.status = "completed"
+            if job.result and job.result.get("message"):
+                job.message = job.result["message"]
+        except JobCancelled:
+            job.status = "cancelled"
+            job.message = "任务已取消"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+# 全局任务管理器实例
+jobs = JobManager()
@@ -1,20 +1,34 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from pathlib import Path
+import asyncio
 import json
 import shutil
 import os
 import subprocess
 import sys
+import threading
+import time
+from typing import Literal
 from tkinter import filedialog
 import tkinter as tk
-from .models import HistoryFilters, HistoryResponse, StatsOverview, ConfigModel
+from .models import HistoryFilters, HistoryResponse, HistoryWindowResponse, StatsOverview, ConfigModel, SchedulerStatus, JobStatus
 from .services import HistoryService
 from .database import db
+from .scheduler import scheduler
+from .jobs import Job, jobs
 
-app = FastAPI(title="Browser History Browser API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动/停止后台维护调度器"""
+    scheduler.start(load_config)
+    yield
+    await scheduler.stop()
+
+app = FastAPI(title="Browser History Browser API", version="1.0.0", lifespan=lifespan)
 
 # 允许跨域请求（用于开发环境）
 app.add_middleware(
@@ -25,6 +39,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 记录进行中的 API 请求，后台维护任务据此让路
+@app.middleware("http")
+async def track_active_requests(request: Request, call_next):
+    # SSE 长连接不计入，否则会一直阻塞后台维护
+    path = request.url.path
+    if not path.startswith("/api/") or path.endswith("/events"):
+        return await call_next(request)
+    scheduler.request_started()
+    try:
+        return await call_next(request)
+    finally:
+        scheduler.request_finished()
+
 # 静态文件服务（前端文件）
 static_path = Path(__file__).parent.parent / "static"
 if static_path.exists():
@@ -64,6 +91,24 @@ async def list_history(
     try:
         result = HistoryService.list_history(page, pageSize, filters)
         return HistoryResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取历史记录失败: {str(e)}")
+
+@app.post("/api/history_window", response_model=HistoryWindowResponse)
+async def history_window(
+    anchor: int = Query(0, ge=0),
+    windowSize: int = Query(200, ge=1, le=500),
+    direction: Literal["forward", "backward"] = Query("forward"),
+    filters: HistoryFilters = HistoryFilters()
+):
+    """获取包含 anchor 行的记录窗口（滚动视图使用），服务端会预取下一个窗口"""
+    try:
+        result = HistoryService.get_history_window(anchor, windowSize, filters, direction)
+        return HistoryWindowResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取历史记录失败: {str(e)}")
 
@@ -102,6 +147,7 @@ async def set_db_path(config: ConfigModel):
         if config.db_path:
             # 重新初始化数据库连接（先关闭旧连接再初始化）
             db.reinit(config.db_path)
+            HistoryService.invalidate_caches()
 
         # 保存配置
         current_config = load_config()
@@ -143,6 +189,63 @@ async def validate_db_path(path: ConfigModel):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"验证数据库路径失败: {str(e)}")
 
+# 文件复制分块大小
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+# 正在写入的复制目标，清理旧数据库时必须跳过
+_copy_targets_in_progress = set()
+_copy_targets_lock = threading.Lock()
+
+def run_copy_browser_db(job: Job, source_path: str) -> dict:
+    """分块复制浏览器数据库到应用目录并设为当前数据库，向 job 汇报进度"""
+    # 目标路径
+    app_data_dir = Path.home() / "AppData" / "Local" / "BHB"
+    app_data_dir.mkdir(parents=True, exist_ok=True)
+
+    # 生成唯一的文件名，并在开始写入前登记为进行中
+    timestamp = int(time.time())
+    with _copy_targets_lock:
+        target_path = app_data_dir / f"browser_history_{timestamp}.db"
+        while target_path.exists() or target_path in _copy_targets_in_progress:
+            timestamp += 1
+            target_path = app_data_dir / f"browser_history_{timestamp}.db"
+        _copy_targets_in_progress.add(target_path)
+
+    # 复制文件
+    try:
+        job.bytes_total = os.path.getsize(source_path)
+        with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+            while True:
+                job.check_cancelled()
+                chunk = src.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                job.bytes_done += len(chunk)
+        shutil.copystat(source_path, target_path)
+
+        # 解除保护前先切换为当前数据库，否则在客户端采用它之前启动的清理会把它删除
+        previous_path = db.db_path
+        try:
+            db.reinit(str(target_path))
+        except Exception:
+            db.reinit(previous_path)
+            raise
+        HistoryService.invalidate_caches()
+    except BaseException:
+        # 取消或失败时删除不完整的副本
+        target_path.unlink(missing_ok=True)
+        raise
+    finally:
+        with _copy_targets_lock:
+            _copy_targets_in_progress.discard(target_path)
+
+    current_config = load_config()
+    current_config["browser_db_path"] = source_path
+    current_config["db_path"] = str(target_path)
+    save_config(current_config)
+
+    return {"success": True, "path": str(target_path), "message": "数据库复制成功"}
+
 @app.post("/api/copy_browser_db_to_app")
 async def copy_browser_db_to_app(source: ConfigModel):
     """复制浏览器数据库到应用目录"""
@@ -151,24 +254,7 @@ async def copy_browser_db_to_app(source: ConfigModel):
         if not source_path or not os.path.exists(source_path):
             raise HTTPException(status_code=400, detail="源文件不存在")
 
-        # 目标路径
-        app_data_dir = Path.home() / "AppData" / "Local" / "BHB"
-        app_data_dir.mkdir(parents=True, exist_ok=True)
-
-        # 生成唯一的文件名
-        import time
-        timestamp = int(time.time())
-        target_path = app_data_dir / f"browser_history_{timestamp}.db"
-
-        # 复制文件
-        shutil.copy2(source_path, target_path)
-
-        current_config = load_config()
-        if source_path is not None:
-            current_config["browser_db_path"] = source_path
-        save_config(current_config)
-
-        return {"success": True, "path": str(target_path), "message": "数据库复制成功"}
+        return run_copy_browser_db(Job("copy_browser_db"), source_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"复制数据库失败: {str(e)}")
 
@@ -266,60 +352,161 @@ async def browse_browser_db_file():
     except Exception as e:
         return {"success": False, "path": "", "message": f"文件选择失败: {str(e)}"}
 
+def run_cleanup_old_dbs(job: Job) -> dict:
+    """删除与当前数据库无关的数据库文件，并向 job 汇报进度"""
+    app_data_dir = Path.home() / "AppData" / "Local" / "BHB"
+    if not app_data_dir.exists():
+        return {"success": True, "cleaned_files": [], "message": "没有需要清理的文件"}
+
+    # 获取当前正在使用的数据库文件路径
+    current_db_path = Path(db.db_path)
+    current_db_name = current_db_path.name
+    with _copy_targets_lock:
+        in_progress = {path.resolve() for path in _copy_targets_in_progress}
+
+    candidates = []
+    for file_path in app_data_dir.glob("*.db*"):
+        # 跳过当前正在使用的数据库文件
+        if file_path.resolve() == current_db_path.resolve():
+            continue
+
+        # 跳过正在复制中的数据库文件
+        if file_path.resolve() in in_progress:
+            continue
+
+        # 跳过与当前数据库相关的 WAL 和 SHM 文件
+        if (file_path.name.startswith(current_db_name.replace('.db', '')) and
+            (file_path.name.endswith('.db-wal') or file_path.name.endswith('.db-shm'))):
+            continue
+
+        try:
+            candidates.append((file_path, file_path.stat().st_size))
+        except OSError:
+            continue
+
+    job.rows_total = len(candidates)
+    job.bytes_total = sum(size for _, size in candidates)
+
+    cleaned_files = []
+    total_size = 0
+
+    for file_path, file_size in candidates:
+        job.check_cancelled()
+        try:
+            file_path.unlink()
+            cleaned_files.append(file_path.name)
+            total_size += file_size
+        except Exception as e:
+            # 如果删除失败，记录但不中断流程
+            print(f"无法删除文件 {file_path.name}: {str(e)}")
+        job.rows_processed += 1
+        job.bytes_done += file_size
+
+    # 格式化文件大小
+    if total_size > 1024 * 1024:  # MB
+        size_str = f"{total_size / (1024 * 1024):.1f} MB"
+    elif total_size > 1024:  # KB
+        size_str = f"{total_size / 1024:.1f} KB"
+    else:  # Bytes
+        size_str = f"{total_size} 字节"
+
+    message = f"清理了 {len(cleaned_files)} 个文件，释放了 {size_str} 空间"
+    if len(cleaned_files) == 0:
+        message = "没有需要清理的文件"
+
+    return {
+        "success": True,
+        "cleaned_files": cleaned_files,
+        "message": message
+    }
+
 @app.get("/api/cleanup_old_dbs")
 async def cleanup_old_dbs():
     """清理与当前使用数据库不相关的所有数据库文件"""
     try:
-        app_data_dir = Path.home() / "AppData" / "Local" / "BHB"
-        if not app_data_dir.exists():
-            return {"success": True, "message": "没有需要清理的文件"}
-        
-        # 获取当前正在使用的数据库文件路径
-        current_db_path = Path(db.db_path)
-        current_db_name = current_db_path.name
-        
-        cleaned_files = []
-        total_size = 0
-        
-        for file_path in app_data_dir.glob("*.db*"):
-            # 跳过当前正在使用的数据库文件
-            if file_path.resolve() == current_db_path.resolve():
-                continue
-            
-            # 跳过与当前数据库相关的 WAL 和 SHM 文件
-            if (file_path.name.startswith(current_db_name.replace('.db', '')) and 
-                (file_path.name.endswith('.db-wal') or file_path.name.endswith('.db-shm'))):
-                continue
-            
-            try:
-                file_size = file_path.stat().st_size
-                file_path.unlink()
-                cleaned_files.append(file_path.name)
-                total_size += file_size
-            except Exception as e:
-                # 如果删除失败，记录但不中断流程
-                print(f"无法删除文件 {file_path.name}: {str(e)}")
-        
-        # 格式化文件大小
-        if total_size > 1024 * 1024:  # MB
-            size_str = f"{total_size / (1024 * 1024):.1f} MB"
-        elif total_size > 1024:  # KB
-            size_str = f"{total_size / 1024:.1f} KB"
-        else:  # Bytes
-            size_str = f"{total_size} 字节"
-        
-        message = f"清理了 {len(cleaned_files)} 个文件，释放了 {size_str} 空间"
-        if len(cleaned_files) == 0:
-            message = "没有需要清理的文件"
-        
-        return {
-            "success": True, 
-            "cleaned_files": cleaned_files,
-            "message": message
-        }
+        return run_cleanup_old_dbs(Job("cleanup_old_dbs"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"清理文件失败: {str(e)}")
 
+@app.post("/api/jobs/copy_browser_db", response_model=JobStatus)
+async def start_copy_browser_db_job(source: ConfigModel):
+    """以后台任务方式复制浏览器数据库到应用目录"""
+    source_path = source.browser_db_path
+    if not source_path or not os.path.exists(source_path):
+        raise HTTPException(status_code=400, detail="源文件不存在")
+    try:
+        job = jobs.start("copy_browser_db", lambda job: run_copy_browser_db(job, source_path))
+        return job.to_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"启动复制任务失败: {str(e)}")
+
+@app.post("/api/jobs/cleanup_old_dbs", response_model=JobStatus)
+async def start_cleanup_old_dbs_job():
+    """以后台任务方式清理旧数据库文件"""
+    if jobs.has_active("copy_browser_db"):
+        raise HTTPException(status_code=409, detail="数据库复制任务进行中，请完成后再清理")
+    try:
+        job = jobs.start("cleanup_old_dbs", run_cleanup_old_dbs)
+        return job.to_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"启动清理任务失败: {str(e)}")
+
+def get_job_or_404(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """获取后台任务状态"""
+    return get_job_or_404(job_id).to_status()
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """请求取消后台任务"""
+    job = get_job_or_404(job_id)
+    job.cancel()
+    return job.to_status()
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """以 Server-Sent Events 推送后台任务进度，任务结束后关闭流"""
+    job = get_job_or_404(job_id)
+
+    async def event_stream():
+        last_payload = None
+        idle_ticks = 0
+        while not await request.is_disconnected():
+            # 先读取结束状态，保证最后一条事件包含最终结果
+            finished = job.finished
+            payload = job.to_status().model_dump_json()
+            if payload != last_payload:
+                yield f"data: {payload}\n\n"
+                last_payload = payload
+                idle_ticks = 0
+            else:
+                idle_ticks += 1
+                if idle_ticks % 30 == 0:
+                    yield ": keep-alive\n\n"
+            if finished:
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/scheduler_status", response_model=SchedulerStatus)
+async def scheduler_status():
+    """获取后台维护调度器状态"""
+    try:
+        return scheduler.get_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取调度器状态失败: {str(e)}")
+
 @app.post("/api/set_top_sites_count")
 async def set_top_sites_count(config: ConfigModel):
     """设置Top站点数量"""
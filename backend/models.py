@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Any, Dict, Literal
 
 class HistoryItem(BaseModel):
     url: str
@@ -10,6 +10,8 @@ class HistoryItem(BaseModel):
 
 class HistoryFilters(BaseModel):
     keyword: Optional[str] = None
+    # 搜索模式: plain (子串匹配) / fuzzy (模糊匹配) / regex (正则表达式)
+    search_mode: Optional[Literal["plain", "fuzzy", "regex"]] = "plain"
     locale: Optional[str] = None
     time_range: Optional[str] = None
     sort_by: Optional[str] = "last_visited_time"
@@ -21,6 +23,12 @@ class HistoryResponse(BaseModel):
     page: int
     page_size: int
 
+class HistoryWindowResponse(BaseModel):
+    items: List[HistoryItem]
+    offset: int
+    total: int
+    window_size: int
+
 class StatsOverview(BaseModel):
     total_visits: int
     distinct_sites: int
@@ -30,3 +38,34 @@ class ConfigModel(BaseModel):
     db_path: Optional[str] = None
     top_sites_count: Optional[int] = 6
     browser_db_path: Optional[str] = None
+
+class MaintenanceTaskStatus(BaseModel):
+    name: str
+    interval: int
+    run_count: int = 0
+    last_run: Optional[int] = None
+    next_run: Optional[int] = None
+    last_duration_ms: Optional[float] = None
+    last_result: Optional[str] = None
+    last_error: Optional[str] = None
+
+class SchedulerStatus(BaseModel):
+    running: bool
+    active_requests: int
+    current_task: Optional[str] = None
+    tasks: List[MaintenanceTaskStatus]
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    message: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    rows_processed: int = 0
+    rows_total: Optional[int] = None
+    bytes_done: int = 0
+    bytes_total: Optional[int] = None
+    elapsed: Optional[float] = None
+    throughput: Optional[float] = None
+    eta: Optional[float] = None
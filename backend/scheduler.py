@@ -0,0 +1,250 @@
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+from .database import db
+from .models import MaintenanceTaskStatus, SchedulerStatus
+from .services import HistoryService
+from .search import process_index_queue
+
+class MaintenanceTask:
+    """单个周期性维护任务及其运行记录"""
+
+    def __init__(self, name: str, interval: int, func: Callable[[], str]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_count = 0
+        self.last_run: Optional[float] = None
+        self.next_run: float = 0
+        self.last_duration_ms: Optional[float] = None
+        self.last_result: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def to_status(self) -> MaintenanceTaskStatus:
+        return MaintenanceTaskStatus(
+            name=self.name,
+            interval=self.interval,
+            run_count=self.run_count,
+            last_run=int(self.last_run) if self.last_run else None,
+            next_run=int(self.next_run) if self.next_run else None,
+            last_duration_ms=self.last_duration_ms,
+            last_result=self.last_result,
+            last_error=self.last_error
+        )
+
+class MaintenanceScheduler:
+    """进程内后台维护调度器：增量同步、三元组索引、PRAGMA optimize、WAL 检查点与统计缓存预热。
+
+    所有任务串行执行，写操作使用独立连接并按小批次提交；
+    有交互请求进行中时会先让路，避免长时间占用写锁。
+    """
+
+    startup_delay: float = 5.0
+    tick_interval: float = 1.0
+    # 等待交互请求结束的最长时间（秒），超过后仍会继续执行以免任务饿死
+    idle_max_wait: float = 10.0
+    sync_batch_size: int = 500
+
+    def __init__(self):
+        self.active_requests = 0
+        self.current_task: Optional[str] = None
+        self._config_loader: Callable[[], dict] = dict
+        self._loop_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.tasks: List[MaintenanceTask] = [
+            MaintenanceTask("browser_sync", 300, self.sync_browser_db),
+            MaintenanceTask("trigram_index", 30, self.index_trigrams),
+            MaintenanceTask("wal_checkpoint", 600, self.checkpoint_wal),
+            MaintenanceTask("optimize", 3600, self.optimize),
+            MaintenanceTask("stats_warmup", 120, self.warm_stats_cache),
+        ]
+
+    @property
+    def running(self) -> bool:
+        return self._loop_task is not None and not self._loop_task.done()
+
+    def start(self, config_loader: Callable[[], dict]):
+        """在应用启动时调用（FastAPI lifespan）"""
+        self._config_loader = config_loader
+        if self.running:
+            return
+        if config_loader().get("maintenance_enabled", True) is False:
+            return
+        self._stopping = False
+        self._loop_task = asyncio.get_running_loop().create_task(self._run_loop())
+
+    async def stop(self):
+        """在应用关闭时调用，取消调度循环"""
+        self._stopping = True
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+    def request_started(self):
+        self.active_requests += 1
+
+    def request_finished(self):
+        self.active_requests = max(0, self.active_requests - 1)
+
+    def get_status(self) -> SchedulerStatus:
+        return SchedulerStatus(
+            running=self.running,
+            active_requests=self.active_requests,
+            current_task=self.current_task,
+            tasks=[task.to_status() for task in self.tasks]
+        )
+
+    async def _run_loop(self):
+        await asyncio.sleep(self.startup_delay)
+        while not self._stopping:
+            for task in self.tasks:
+                if self._stopping:
+                    break
+                if time.time() >= task.next_run:
+                    await self._wait_for_idle_async()
+                    await self._run_task(task)
+            await asyncio.sleep(self.tick_interval)
+
+    async def _run_task(self, task: MaintenanceTask):
+        self.current_task = task.name
+        started = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            task.last_result = await loop.run_in_executor(None, task.func)
+            task.last_error = None
+        except Exception as e:
+            task.last_error = str(e)
+        finally:
+            task.run_count += 1
+            task.last_run = started
+            task.last_duration_ms = round((time.time() - started) * 1000, 1)
+            task.next_run = time.time() + task.interval
+            self.current_task = None
+
+    async def _wait_for_idle_async(self):
+        deadline = time.time() + self.idle_max_wait
+        while self.active_requests > 0 and time.time() < deadline and not self._stopping:
+            await asyncio.sleep(0.05)
+
+    def _wait_for_idle(self):
+        """在工作线程中等待交互请求结束（有最长等待时间）"""
+        deadline = time.time() + self.idle_max_wait
+        while self.active_requests > 0 and time.time() < deadline and not self._stopping:
+            time.sleep(0.05)
+
+    def sync_browser_db(self) -> str:
+        """从配置的 browser_db_path 增量导入新访问记录"""
+        source_path = self._config_loader().get("browser_db_path")
+        if not source_path or not Path(source_path).exists():
+            return "未配置浏览器数据库，跳过"
+        if Path(source_path).resolve() == Path(db.db_path).resolve():
+            return "浏览器数据库即当前数据库，跳过"
+
+        # 只读打开浏览器数据库，避免影响浏览器本身
+        source_uri = Path(source_path).resolve().as_uri() + "?mode=ro"
+        src = sqlite3.connect(source_uri, uri=True, check_same_thread=False)
+        dst = db.open_connection()
+        imported = 0
+        try:
+            has_table = src.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='navigation_history'"
+            ).fetchone()
+            if not has_table:
+                return "不是有效的浏览器历史数据库，跳过"
+
+            watermark = dst.execute(
+                "SELECT COALESCE(MAX(last_visited_time), 0) FROM navigation_history"
+            ).fetchone()[0]
+            cursor = src.execute(
+                """
+                SELECT url, title, last_visited_time, num_visits, locale
+                FROM navigation_history
+                WHERE last_visited_time >= ?
+                ORDER BY last_visited_time
+                """,
+                (watermark,)
+            )
+            while not self._stopping:
+                rows = cursor.fetchmany(self.sync_batch_size)
+                if not rows:
+                    break
+                # 每个批次是一个短事务，批次之间让出写锁给交互请求
+                # 用 upsert 而非 REPLACE：保留原 rowid，三元组索引无需删除重建
+                self._wait_for_idle()
+                with dst:
+                    cursor_dst = dst.executemany(
+                        """
+                        INSERT INTO navigation_history (url, title, last_visited_time, num_visits, locale)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(url) DO UPDATE SET
+                            title = excluded.title,
+                            last_visited_time = excluded.last_visited_time,
+                            num_visits = excluded.num_visits,
+                            locale = excluded.locale
+                        WHERE excluded.last_visited_time > navigation_history.last_visited_time
+                            OR excluded.title IS NOT navigation_history.title
+                        """,
+                        rows
+                    )
+                # 水位线上的记录每次都会被重新读取，只统计实际插入或更新的行
+                # （rowcount 不含触发器写入的行）
+                imported += cursor_dst.rowcount
+        finally:
+            src.close()
+            dst.close()
+
+        if imported:
+            HistoryService.invalidate_caches()
+        return f"同步了 {imported} 条记录"
+
+    def index_trigrams(self) -> str:
+        """分批处理三元组索引队列，批次之间让路给交互请求"""
+        if not db.search_index_enabled:
+            return "未启用搜索索引，跳过"
+        conn = db.open_connection()
+        indexed = 0
+        try:
+            while not self._stopping:
+                self._wait_for_idle()
+                processed = process_index_queue(conn)
+                if not processed:
+                    break
+                indexed += processed
+        finally:
+            conn.close()
+        return f"索引了 {indexed} 条记录"
+
+    def checkpoint_wal(self) -> str:
+        """执行 PASSIVE 检查点，不会等待或阻塞读写"""
+        conn = db.open_connection()
+        try:
+            busy, log_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        finally:
+            conn.close()
+        return f"WAL 帧 {log_frames}，已检查点 {checkpointed}" + ("（部分跳过）" if busy else "")
+
+    def optimize(self) -> str:
+        """采样执行 ANALYZE 更新查询规划器统计信息"""
+        conn = db.open_connection()
+        try:
+            # PRAGMA optimize 只分析本连接查询过的表，新连接上等于什么都不做；
+            # analysis_limit 限制每个索引的采样行数，大库上也能很快完成
+            conn.execute("PRAGMA analysis_limit = 400")
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        return "已完成"
+
+    def warm_stats_cache(self) -> str:
+        """预热默认 7d 统计概览缓存"""
+        HistoryService.get_stats_overview('7d', use_cache=False)
+        return "已预热 7d 统计"
+
+# 全局调度器实例
+scheduler = MaintenanceScheduler()
@@ -0,0 +1,291 @@
+import re
+import sqlite3
+from functools import lru_cache
+from typing import List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# 每批处理的待索引记录数
+INDEX_BATCH_SIZE = 500
+# 估算倒排列表长度时的计数上限
+POSTING_SIZE_CAP = 10000
+# 正则搜索最多校验的三元组数量（最稀有的若干个已足够缩小范围）
+MAX_PROBE_TRIGRAMS = 8
+# 模糊搜索关键词的最小长度，更短的关键词在允许的编辑距离下几乎匹配所有记录
+MIN_FUZZY_KEYWORD_LENGTH = 3
+# 模糊搜索允许的最大编辑距离上限
+MAX_FUZZY_DISTANCE = 3
+
+_TRIGRAM_TRIGGERS = ("trg_history_trigram_insert", "trg_history_trigram_update", "trg_history_trigram_delete")
+
+def trigrams(text: str) -> Set[str]:
+    """返回文本（已转小写）中的所有三字符片段"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def doc_trigrams(url: str, title: Optional[str]) -> Set[str]:
+    """一条历史记录的索引三元组：URL 与标题分别切分，避免跨字段拼接"""
+    return trigrams(url or '') | trigrams(title or '')
+
+def max_fuzzy_distance(keyword: str) -> int:
+    """模糊搜索允许的最大编辑距离 k：每 3 个字符容许 1 处编辑（不足 6 个字符时按精确子串处理）。
+
+    这样关键词总能切成 k + 1 段长度不少于 3 的片段，候选记录可以完全由三元组索引筛出。
+    """
+    return max(0, min(MAX_FUZZY_DISTANCE, len(keyword) // 3 - 1))
+
+def fuzzy_required_pieces(keyword: str) -> List[str]:
+    """把关键词切成 k + 1 段：编辑距离不超过 k 的匹配至少原样包含其中一段"""
+    count = max_fuzzy_distance(keyword) + 1
+    size, extra = divmod(len(keyword), count)
+    pieces = []
+    start = 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        pieces.append(keyword[start:end])
+        start = end
+    return [piece for piece in pieces if piece]
+
+@lru_cache(maxsize=64)
+def _fuzzy_pattern(pattern: str) -> Tuple[int, dict, int, int]:
+    """预处理模式串（长度、字符位掩码表、全位掩码、最高位），同一关键词在整次查询中复用"""
+    pattern = pattern.lower()
+    peq = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    m = len(pattern)
+    return m, peq, (1 << m) - 1, 1 << (m - 1) if m else 0
+
+def fuzzy_distance(pattern: str, text: Optional[str]) -> int:
+    """pattern 与 text 任意子串之间的最小编辑距离（Myers 位并行算法，忽略大小写）"""
+    m, peq, mask, high = _fuzzy_pattern(pattern)
+    if m == 0:
+        return 0
+    if not text:
+        return m
+
+    pv = mask
+    mv = 0
+    score = m
+    best = m
+    for c in text.lower():
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # 子串匹配：文本起点不计代价，因此左移时不补 1
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best = score
+            if best == 0:
+                break
+    return best
+
+# 同一次搜索中 COUNT、取数与排序会对同一批候选重复计算，缓存最近的结果
+@lru_cache(maxsize=65536)
+def _history_fuzzy_distance(pattern: str, title: Optional[str], url: Optional[str]) -> int:
+    distance = fuzzy_distance(pattern, title)
+    if distance == 0:
+        return 0
+    return min(distance, fuzzy_distance(pattern, url))
+
+@lru_cache(maxsize=64)
+def compile_regex(pattern: str):
+    """编译（并缓存）忽略大小写的正则表达式，非法表达式抛出 ValueError"""
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"无效的正则表达式: {e}")
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    if value is None:
+        return False
+    return compile_regex(pattern).search(value) is not None
+
+def _collect_literal_runs(parsed, runs: List[str]):
+    """收集正则表达式任何匹配都必须包含的连续字面量"""
+    current = []
+
+    def flush():
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        flush()
+        if op is sre_parse.SUBPATTERN:
+            _collect_literal_runs(av[-1], runs)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            _collect_literal_runs(av[2], runs)
+        # 分支、字符类、锚点等不提供必需的字面量
+    flush()
+
+def regex_required_trigrams(pattern: str) -> Set[str]:
+    """提取正则表达式任何匹配都必须包含的三元组，无法分析时返回空集合"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return set()
+    runs: List[str] = []
+    _collect_literal_runs(parsed, runs)
+    required: Set[str] = set()
+    for run in runs:
+        required |= trigrams(run)
+    return required
+
+def posting_sizes(conn: sqlite3.Connection, grams: Set[str], cap: int = POSTING_SIZE_CAP) -> List[Tuple[str, int]]:
+    """估算每个三元组的倒排列表长度（以 cap 为上限），按从稀有到常见排序"""
+    sizes = []
+    for gram in grams:
+        count = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM history_trigrams WHERE trigram = ? LIMIT ?)",
+            (gram, cap)
+        ).fetchone()[0]
+        sizes.append((gram, count))
+    sizes.sort(key=lambda item: (item[1], item[0]))
+    return sizes
+
+def trigram_candidate_subquery(conn: sqlite3.Connection, gram_sets: List[Set[str]]) -> Tuple[str, List]:
+    """至少包含其中一组全部三元组的记录。
+
+    每组从最稀有的三元组出发，其余用主键探测校验；尚未索引的记录一律作为候选，保证结果完整。
+    """
+    parts = []
+    params: List = []
+    for grams in gram_sets:
+        ordered = [gram for gram, _ in posting_sizes(conn, grams)][:MAX_PROBE_TRIGRAMS]
+        driver, probes = ordered[0], ordered[1:]
+        sql = "SELECT t1.doc_id FROM history_trigrams t1 WHERE t1.trigram = ?"
+        for _ in probes:
+            sql += " AND EXISTS (SELECT 1 FROM history_trigrams t2 WHERE t2.trigram = ? AND t2.doc_id = t1.doc_id)"
+        parts.append(sql)
+        params.extend([driver, *probes])
+    parts.append("SELECT doc_id FROM history_trigram_queue")
+    return " UNION ".join(parts), params
+
+def register_functions(conn: sqlite3.Connection):
+    """在连接上注册 REGEXP 与 fuzzy_distance 函数"""
+    conn.create_function("regexp", 2, _regexp, deterministic=True)
+    conn.create_function("fuzzy_distance", 3, _history_fuzzy_distance, deterministic=True)
+
+def trigram_index_exists(conn: sqlite3.Connection) -> bool:
+    """数据库中是否已有三元组索引表"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='history_trigrams'"
+    ).fetchone() is not None
+
+def drop_trigram_index(conn: sqlite3.Connection):
+    """删除三元组索引表及触发器（关闭搜索索引时调用，释放的页面可由 VACUUM 回收）"""
+    for trigger in _TRIGRAM_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS history_trigram_queue")
+    conn.execute("DROP TABLE IF EXISTS history_trigrams")
+
+def init_trigram_index(conn: sqlite3.Connection):
+    """创建三元组倒排索引表及维护触发器；首次创建时把所有记录加入待索引队列"""
+    queue_columns = {row[1] for row in conn.execute("PRAGMA table_info(history_trigram_queue)")}
+    if queue_columns and "old_url" not in queue_columns:
+        # 旧版布局（额外的 doc_id 二级索引）：删除后按新布局重建
+        drop_trigram_index(conn)
+    exists = trigram_index_exists(conn)
+
+    # 倒排表只有 (trigram, doc_id) 主键，没有按 doc_id 的二级索引以节省空间；
+    # 删除旧的倒排项时根据队列中记录的旧 URL/标题重新切分三元组，再按主键删除
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history_trigrams (
+            trigram TEXT NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, doc_id)
+        ) WITHOUT ROWID
+    """)
+    # 待（重新）索引的记录，由触发器维护；old_url/old_title 为上次建立索引时的内容（未索引过则为 NULL）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history_trigram_queue (
+            doc_id INTEGER PRIMARY KEY,
+            old_url TEXT,
+            old_title TEXT
+        )
+    """)
+
+    # 触发器内的 INSERT OR IGNORE 会被外层语句的冲突处理方式覆盖（如 upsert 时按 ABORT 处理），
+    # 因此用 NOT EXISTS 去重；每次启动重建触发器，使旧数据库也使用最新定义。
+    # 记录已在队列中时保留最早的旧内容，它才是当前倒排项对应的内容
+    enqueue = (
+        "INSERT INTO history_trigram_queue(doc_id, old_url, old_title) SELECT {rowid}, {url}, {title} "
+        "WHERE NOT EXISTS (SELECT 1 FROM history_trigram_queue WHERE doc_id = {rowid});"
+    )
+    for trigger in _TRIGRAM_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute(f"""
+        CREATE TRIGGER trg_history_trigram_insert AFTER INSERT ON navigation_history
+        BEGIN
+            {enqueue.format(rowid="new.rowid", url="NULL", title="NULL")}
+        END
+    """)
+    # 只有 URL 或标题实际变化时才重新索引（同步时的 upsert 会 SET 标题列）
+    conn.execute(f"""
+        CREATE TRIGGER trg_history_trigram_update AFTER UPDATE OF url, title ON navigation_history
+        WHEN old.url IS NOT new.url OR old.title IS NOT new.title
+        BEGIN
+            {enqueue.format(rowid="new.rowid", url="old.url", title="old.title")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_history_trigram_delete AFTER DELETE ON navigation_history
+        BEGIN
+            {enqueue.format(rowid="old.rowid", url="old.url", title="old.title")}
+        END
+    """)
+
+    if not exists:
+        conn.execute("INSERT OR IGNORE INTO history_trigram_queue(doc_id) SELECT rowid FROM navigation_history")
+
+def process_index_queue(conn: sqlite3.Connection, batch_size: int = INDEX_BATCH_SIZE) -> int:
+    """索引一批待处理记录（单个短写事务），返回处理数量"""
+    # 读取与写入放在同一事务中，避免处理期间记录再次变更导致索引过期
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        queued = conn.execute(
+            "SELECT doc_id, old_url, old_title FROM history_trigram_queue LIMIT ?", (batch_size,)
+        ).fetchall()
+        doc_ids = [row[0] for row in queued]
+        if doc_ids:
+            placeholders = ", ".join("?" for _ in doc_ids)
+            current = {row[0]: doc_trigrams(row[1], row[2]) for row in conn.execute(
+                f"SELECT rowid, url, title FROM navigation_history WHERE rowid IN ({placeholders})",
+                doc_ids
+            ).fetchall()}
+
+            stale = []
+            entries = []
+            for doc_id, old_url, old_title in queued:
+                old_grams = doc_trigrams(old_url, old_title) if old_url is not None or old_title is not None else set()
+                new_grams = current.get(doc_id, set())
+                stale.extend((gram, doc_id) for gram in old_grams - new_grams)
+                entries.extend((gram, doc_id) for gram in new_grams - old_grams)
+            # 按主键顺序写入，减少 B 树页面的随机写
+            stale.sort()
+            entries.sort()
+
+            conn.executemany("DELETE FROM history_trigrams WHERE trigram = ? AND doc_id = ?", stale)
+            conn.executemany("INSERT OR IGNORE INTO history_trigrams(trigram, doc_id) VALUES (?, ?)", entries)
+            conn.executemany("DELETE FROM history_trigram_queue WHERE doc_id = ?", [(d,) for d in doc_ids])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(doc_ids)
@@ -1,11 +1,64 @@
-from typing import List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
+import threading
 import time
 from .database import db
 from .models import HistoryItem, HistoryFilters, StatsOverview
+from .search import (
+    MIN_FUZZY_KEYWORD_LENGTH, compile_regex, fuzzy_required_pieces, max_fuzzy_distance,
+    regex_required_trigrams, trigram_candidate_subquery, trigrams
+)
 
 class HistoryService:
     top_sites_count: int = 6
+    # 所有缓存条目都带有写入时的缓存代数，代数变化后的旧结果一律丢弃
+    _cache_generation: int = 0
+    # 统计概览缓存：(time_range, top_sites_count) -> (缓存代数, 写入时间, 结果)
+    # 只缓存预设时间范围，自定义范围各不相同，缓存既无命中也会无限增长
+    stats_cache_ttl: int = 120
+    stats_cache_ranges: Tuple[str, ...] = ('1d', '7d', '30d', '90d', 'all')
+    _stats_cache: Dict[Tuple[str, int], Tuple[Tuple[int, int], float, StatsOverview]] = {}
+    # 滚动窗口缓存：(过滤条件, offset, 窗口大小) -> (缓存代数, 写入时间, 记录)，按 LRU 淘汰
+    window_cache_ttl: int = 60
+    window_cache_size: int = 64
+    _window_cache: "OrderedDict[Tuple[str, int, int], Tuple[Tuple[int, int], float, List[HistoryItem]]]" = OrderedDict()
+    # 记录总数缓存：过滤条件 -> (缓存代数, 写入时间, 总数)，按 LRU 淘汰
+    count_cache_size: int = 256
+    _count_cache: "OrderedDict[str, Tuple[Tuple[int, int], float, int]]" = OrderedDict()
+    _prefetch_pending: Set[Tuple[str, int, int]] = set()
+    _window_lock = threading.Lock()
+    # 单线程预取，避免快速滚动时并发查询堆积
+    _prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="window-prefetch")
+
+    @staticmethod
+    def _cache_token() -> Tuple[int, int]:
+        """当前缓存代数：切换数据库或调用 invalidate_caches() 后变化"""
+        return db._generation, HistoryService._cache_generation
+
+    @staticmethod
+    def _cache_get(cache: "OrderedDict", key, ttl: int):
+        """读取 LRU 缓存条目，过期或代数不符时返回 None（调用方持有 _window_lock）"""
+        cached = cache.get(key)
+        if cached is None:
+            return None
+        token, written_at, value = cached
+        if token != HistoryService._cache_token() or time.time() - written_at >= ttl:
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(cache: "OrderedDict", key, token: Tuple[int, int], value, max_size: int):
+        """写入 LRU 缓存条目；查询期间缓存已失效时直接丢弃结果（调用方持有 _window_lock）"""
+        if token != HistoryService._cache_token():
+            return
+        cache[key] = (token, time.time(), value)
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
 
     @staticmethod
     def parse_time_range(time_range: str) -> Tuple[Optional[int], Optional[int]]:
@@ -41,7 +94,37 @@ class HistoryService:
         params = []
         
         # 关键词搜索
-        if filters.keyword:
+        if filters.keyword and filters.search_mode == 'regex':
+            # 启用搜索索引时先用三元组缩小候选范围，再逐条用正则校验
+            compile_regex(filters.keyword)
+            required = regex_required_trigrams(filters.keyword)
+            if required and db.search_index_enabled:
+                subquery, sub_params = trigram_candidate_subquery(db.get_connection(), [required])
+                conditions.append(f"rowid IN ({subquery})")
+                params.extend(sub_params)
+            conditions.append("(title REGEXP ? OR url REGEXP ?)")
+            params.extend([filters.keyword, filters.keyword])
+        elif filters.keyword and filters.search_mode == 'fuzzy':
+            if len(filters.keyword) < MIN_FUZZY_KEYWORD_LENGTH:
+                raise ValueError(f"模糊搜索关键词至少需要 {MIN_FUZZY_KEYWORD_LENGTH} 个字符")
+            # 先用必要条件筛选候选（匹配必然原样包含某一段关键词片段），再逐条校验编辑距离
+            pieces = fuzzy_required_pieces(filters.keyword)
+            if db.search_index_enabled and all(len(piece) >= 3 for piece in pieces):
+                subquery, sub_params = trigram_candidate_subquery(
+                    db.get_connection(), [trigrams(piece) for piece in pieces]
+                )
+                conditions.append(f"rowid IN ({subquery})")
+                params.extend(sub_params)
+            elif filters.keyword.isascii():
+                # 未启用搜索索引：逐行用 LIKE 检查片段（LIKE 只对 ASCII 忽略大小写）
+                piece_conditions = []
+                for piece in pieces:
+                    piece_conditions.append("title LIKE ? OR url LIKE ?")
+                    params.extend([f"%{piece}%", f"%{piece}%"])
+                conditions.append("(" + " OR ".join(piece_conditions) + ")")
+            conditions.append("fuzzy_distance(?, title, url) <= ?")
+            params.extend([filters.keyword, max_fuzzy_distance(filters.keyword)])
+        elif filters.keyword:
             conditions.append("(title LIKE ? OR url LIKE ?)")
             keyword_pattern = f"%{filters.keyword}%"
             params.extend([keyword_pattern, keyword_pattern])
@@ -62,24 +145,41 @@ class HistoryService:
         return where_clause, params
     
     @staticmethod
-    def list_history(page: int, page_size: int, filters: HistoryFilters) -> dict:
-        """获取历史记录列表"""
-        # 构建WHERE子句
-        where_clause, params = HistoryService.build_where_clause(filters)
-        
-        # 构建ORDER BY子句
+    def build_order_clause(filters: HistoryFilters) -> Tuple[str, List]:
+        """构建ORDER BY子句和参数（以 rowid 兜底，保证分页/窗口之间顺序稳定）"""
         valid_sort_fields = ['title', 'last_visited_time', 'num_visits']
         sort_by = filters.sort_by if filters.sort_by in valid_sort_fields else 'last_visited_time'
         sort_order = 'DESC' if filters.sort_order == 'desc' else 'ASC'
-        order_clause = f" ORDER BY {sort_by} {sort_order}"
-        
-        # 计算总数
+        order_clause = f" ORDER BY {sort_by} {sort_order}, rowid {sort_order}"
+        order_params = []
+        if filters.keyword and filters.search_mode == 'fuzzy':
+            # 模糊搜索按相似度（编辑距离）优先排序
+            order_clause = f" ORDER BY fuzzy_distance(?, title, url) ASC, {sort_by} {sort_order}, rowid {sort_order}"
+            order_params.append(filters.keyword)
+        return order_clause, order_params
+
+    @staticmethod
+    def count_history(filters: HistoryFilters, where_clause: str, params: List) -> int:
+        """统计符合条件的记录数（按过滤条件缓存，翻页/滚动时不重复 COUNT）"""
+        cache_key = filters.model_dump_json()
+        with HistoryService._window_lock:
+            cached = HistoryService._cache_get(HistoryService._count_cache, cache_key, HistoryService.window_cache_ttl)
+        if cached is not None:
+            return cached
+
+        token = HistoryService._cache_token()
         count_query = f"SELECT COUNT(*) as total FROM navigation_history{where_clause}"
         total_result = db.execute_query(count_query, tuple(params))
         total = total_result[0]['total'] if total_result else 0
-        
-        # 获取分页数据
-        offset = (page - 1) * page_size
+        with HistoryService._window_lock:
+            HistoryService._cache_put(HistoryService._count_cache, cache_key, token, total,
+                                      HistoryService.count_cache_size)
+        return total
+
+    @staticmethod
+    def fetch_history_rows(where_clause: str, params: List, order_clause: str, order_params: List,
+                           limit: int, offset: int) -> List[HistoryItem]:
+        """按条件获取一段历史记录"""
         data_query = f"""
             SELECT url, title, last_visited_time, num_visits, locale 
             FROM navigation_history
@@ -88,12 +188,11 @@ class HistoryService:
             LIMIT ? OFFSET ?
         """
         
-        # 添加分页参数
-        params.extend([page_size, offset])
-        rows = db.execute_query(data_query, tuple(params))
+        # 添加排序与分页参数
+        rows = db.execute_query(data_query, tuple(params + order_params + [limit, offset]))
         
         # 转换为模型
-        items = [
+        return [
             HistoryItem(
                 url=row['url'],
                 title=row['title'],
@@ -103,6 +202,22 @@ class HistoryService:
             )
             for row in rows
         ]
+
+    @staticmethod
+    def list_history(page: int, page_size: int, filters: HistoryFilters) -> dict:
+        """获取历史记录列表"""
+        # 构建WHERE子句
+        where_clause, params = HistoryService.build_where_clause(filters)
+        
+        # 构建ORDER BY子句
+        order_clause, order_params = HistoryService.build_order_clause(filters)
+        
+        # 计算总数
+        total = HistoryService.count_history(filters, where_clause, params)
+        
+        # 获取分页数据
+        offset = (page - 1) * page_size
+        items = HistoryService.fetch_history_rows(where_clause, params, order_clause, order_params, page_size, offset)
         
         return {
             'items': items,
@@ -110,6 +225,66 @@ class HistoryService:
             'page': page,
             'page_size': page_size
         }
+
+    @staticmethod
+    def _load_window(filters: HistoryFilters, offset: int, window_size: int) -> List[HistoryItem]:
+        """获取一个窗口的记录，优先从缓存读取"""
+        cache_key = (filters.model_dump_json(), offset, window_size)
+        with HistoryService._window_lock:
+            cached = HistoryService._cache_get(HistoryService._window_cache, cache_key, HistoryService.window_cache_ttl)
+        if cached is not None:
+            return cached
+
+        token = HistoryService._cache_token()
+        where_clause, params = HistoryService.build_where_clause(filters)
+        order_clause, order_params = HistoryService.build_order_clause(filters)
+        items = HistoryService.fetch_history_rows(where_clause, params, order_clause, order_params, window_size, offset)
+
+        # 预取线程的查询可能跨越 invalidate_caches()，代数不符的结果不写入缓存
+        with HistoryService._window_lock:
+            HistoryService._cache_put(HistoryService._window_cache, cache_key, token, items,
+                                      HistoryService.window_cache_size)
+        return items
+
+    @staticmethod
+    def _prefetch_window(filters: HistoryFilters, offset: int, window_size: int):
+        """在后台线程中预取窗口（同一窗口只排队一次）"""
+        cache_key = (filters.model_dump_json(), offset, window_size)
+        with HistoryService._window_lock:
+            if cache_key in HistoryService._window_cache or cache_key in HistoryService._prefetch_pending:
+                return
+            HistoryService._prefetch_pending.add(cache_key)
+
+        def run():
+            try:
+                HistoryService._load_window(filters, offset, window_size)
+            except Exception as e:
+                print(f"预取窗口失败: {str(e)}")
+            finally:
+                with HistoryService._window_lock:
+                    HistoryService._prefetch_pending.discard(cache_key)
+
+        HistoryService._prefetch_executor.submit(run)
+
+    @staticmethod
+    def get_history_window(anchor: int, window_size: int, filters: HistoryFilters, direction: str = 'forward') -> dict:
+        """获取包含 anchor 行的记录窗口，并预取滚动方向上的下一个窗口"""
+        offset = anchor // window_size * window_size
+
+        where_clause, params = HistoryService.build_where_clause(filters)
+        total = HistoryService.count_history(filters, where_clause, params)
+        items = HistoryService._load_window(filters, offset, window_size)
+
+        next_offset = offset - window_size if direction == 'backward' else offset + window_size
+        if 0 <= next_offset < total:
+            HistoryService._prefetch_window(filters, next_offset, window_size)
+
+        return {
+            'items': items,
+            'offset': offset,
+            'total': total,
+            'window_size': window_size
+        }
     
     @staticmethod
     def extract_domain(url: str) -> str:
@@ -125,8 +300,36 @@ class HistoryService:
             return url
     
     @staticmethod
-    def get_stats_overview(time_range: str = '7d') -> StatsOverview:
+    def invalidate_caches():
+        """清空统计、计数与窗口缓存（数据变更或切换数据库后调用）"""
+        with HistoryService._window_lock:
+            HistoryService._cache_generation += 1
+            HistoryService._stats_cache.clear()
+            HistoryService._count_cache.clear()
+            HistoryService._window_cache.clear()
+
+    @staticmethod
+    def get_stats_overview(time_range: str = '7d', use_cache: bool = True) -> StatsOverview:
         """获取统计概览"""
+        if time_range not in HistoryService.stats_cache_ranges:
+            return HistoryService._compute_stats_overview(time_range)
+
+        cache_key = (time_range, HistoryService.top_sites_count)
+        if use_cache:
+            cached = HistoryService._stats_cache.get(cache_key)
+            if (cached and cached[0] == HistoryService._cache_token()
+                    and time.time() - cached[1] < HistoryService.stats_cache_ttl):
+                return cached[2]
+
+        token = HistoryService._cache_token()
+        stats = HistoryService._compute_stats_overview(time_range)
+        if token == HistoryService._cache_token():
+            HistoryService._stats_cache[cache_key] = (token, time.time(), stats)
+        return stats
+
+    @staticmethod
+    def _compute_stats_overview(time_range: str) -> StatsOverview:
+        """执行统计概览查询（不经过缓存）"""
         # 构建时间过滤器
         filters = HistoryFilters(time_range=time_range)
         where_clause, params = HistoryService.build_where_clause(filters)
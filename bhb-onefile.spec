@@ -25,6 +25,9 @@ a = Analysis(
         'backend.models', 
         'backend.services',
         'backend.database',
+        'backend.scheduler',
+        'backend.jobs',
+        'backend.search',
         'uvicorn.lifespan.on',
         'uvicorn.lifespan.off',
         'uvicorn.protocols.websockets.auto',
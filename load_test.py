@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+并发压测工具：在生成的测试数据库上启动本地服务器，
+以可配置的并发度发送真实比例的 /api/list_history 与 /api/stats_overview 请求，
+并报告吞吐量、延迟分位数和错误率。
+
+示例:
+    python load_test.py --rows 50000 --concurrency 32 --duration 30
+    python load_test.py --url http://127.0.0.1:8000 --concurrency 8   # 压测已运行的实例
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+ROOT_DIR = Path(__file__).parent
+
+# 请求比例：(场景名, 权重)
+TRAFFIC_MIX = [
+    ("list_first_page", 30),
+    ("list_deep_page", 15),
+    ("list_sorted", 15),
+    ("search_plain", 12),
+    ("search_fuzzy", 5),
+    ("search_regex", 5),
+    ("stats_overview", 18),
+]
+
+TIME_RANGES = ["7d", "30d", "90d", "all"]
+# 使用随机自定义时间范围的请求比例：服务端只缓存预设范围，这部分请求必然穿透缓存
+DEFAULT_CUSTOM_RANGE_RATIO = 0.5
+SORT_FIELDS = ["last_visited_time", "num_visits", "title"]
+
+def make_vocab(seed: int) -> List[str]:
+    """按随机种子生成词表（与 generate_database 使用相同种子时一致）"""
+    rng = random.Random(seed)
+    return [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))) for _ in range(5000)]
+
+def generate_database(db_path: Path, rows: int, seed: int = 42, build_index: bool = True) -> List[str]:
+    """生成测试数据库，返回可用作搜索关键词的词表"""
+    sys.path.insert(0, str(ROOT_DIR))
+    from backend.search import init_trigram_index, process_index_queue
+
+    rng = random.Random(seed + 1)
+    vocab = make_vocab(seed)
+    hosts = [f"{rng.choice(vocab)}.{rng.choice(['com', 'org', 'net', 'io', 'cn'])}" for _ in range(max(10, rows // 50))]
+    now = int(time.time())
+
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS navigation_history (
+            url TEXT PRIMARY KEY,
+            title TEXT,
+            last_visited_time INTEGER,
+            num_visits INTEGER DEFAULT 0,
+            locale TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_last_visited_time ON navigation_history(last_visited_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_num_visits ON navigation_history(num_visits)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_title ON navigation_history(title)")
+    if build_index:
+        init_trigram_index(conn)
+
+    batch = []
+    for i in range(rows):
+        path = '/'.join(rng.sample(vocab, 3))
+        batch.append((
+            f"https://{rng.choice(hosts)}/{path}?id={i}",
+            ' '.join(rng.sample(vocab, 4)).title(),
+            now - rng.randint(0, 365 * 86400),
+            rng.randint(1, 100),
+            rng.choice(["zh-CN", "en-US"])
+        ))
+        if len(batch) >= 10000:
+            conn.executemany("INSERT INTO navigation_history (url, title, last_visited_time, num_visits, locale) VALUES (?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO navigation_history (url, title, last_visited_time, num_visits, locale) VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+
+    if build_index:
+        while process_index_queue(conn, 5000):
+            pass
+    conn.close()
+    return vocab
+
+class HttpConnection:
+    """极简的 HTTP/1.1 keep-alive 客户端（仅用于压测，避免额外依赖）"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            return await self._send(method, path, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # 服务端关闭了空闲连接：重连后重试一次
+            await self.close()
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            return await self._send(method, path, body)
+
+    async def _send(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, bytes]:
+        headers = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            "Accept: application/json",
+        ]
+        if body is not None:
+            headers.append("Content-Type: application/json")
+            headers.append(f"Content-Length: {len(body)}")
+        self._writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + (body or b""))
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        length = None
+        chunked = False
+        close_after = False
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            value = value.strip()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value.lower():
+                chunked = True
+            elif name == "connection" and value.lower() == "close":
+                close_after = True
+
+        if chunked:
+            data = bytearray()
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b"\r\n")
+                    break
+                data += await self._reader.readexactly(size)
+                await self._reader.readexactly(2)
+            payload = bytes(data)
+        else:
+            payload = await self._reader.readexactly(length or 0)
+
+        if close_after:
+            await self.close()
+        return status, payload
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = None
+        self._writer = None
+
+class TrafficGenerator:
+    """按 TRAFFIC_MIX 比例生成请求"""
+
+    def __init__(self, vocab: List[str], rows: int, seed: int, custom_range_ratio: float = DEFAULT_CUSTOM_RANGE_RATIO):
+        self.vocab = vocab
+        self.max_page = max(1, rows // 100)
+        self.custom_range_ratio = custom_range_ratio
+        self.rng = random.Random(seed)
+        self.names = [name for name, _ in TRAFFIC_MIX]
+        self.weights = [weight for _, weight in TRAFFIC_MIX]
+
+    def time_range(self) -> str:
+        """预设范围（可命中服务端缓存）或精确到秒的随机自定义范围（不会命中缓存）"""
+        rng = self.rng
+        if rng.random() >= self.custom_range_ratio:
+            return rng.choice(TIME_RANGES)
+        now = int(time.time())
+        start = now - rng.randint(86400, 365 * 86400)
+        end = min(now, start + rng.randint(86400, 180 * 86400))
+        return f"{start}-{end}"
+
+    def next_request(self) -> Tuple[str, str, str, Optional[bytes]]:
+        """返回 (场景名, 方法, 路径, 请求体)"""
+        rng = self.rng
+        scenario = rng.choices(self.names, self.weights)[0]
+        if scenario == "stats_overview":
+            return scenario, "GET", "/api/stats_overview?" + urlencode({"timeRange": self.time_range()}), None
+
+        page, page_size = 1, 20
+        # 深分页的页码按总记录数抽取，不加时间过滤，保证每次都真正跳过 OFFSET 行而不是返回空页
+        filters = {} if scenario == "list_deep_page" else {"time_range": self.time_range()}
+        if scenario == "list_deep_page":
+            page, page_size = rng.randint(2, self.max_page), 100
+        elif scenario == "list_sorted":
+            filters["sort_by"] = rng.choice(SORT_FIELDS)
+            filters["sort_order"] = rng.choice(["asc", "desc"])
+        elif scenario == "search_plain":
+            filters["keyword"] = rng.choice(self.vocab)[:rng.randint(3, 6)]
+        elif scenario == "search_fuzzy":
+            word = list(rng.choice(self.vocab))
+            word[rng.randrange(len(word))] = rng.choice(string.ascii_lowercase)
+            filters["keyword"] = ''.join(word)
+            filters["search_mode"] = "fuzzy"
+        elif scenario == "search_regex":
+            word = rng.choice(self.vocab)
+            filters["keyword"] = f"{word[:3]}.{word[4:]}/"
+            filters["search_mode"] = "regex"
+        if filters.get("time_range") == "all":
+            del filters["time_range"]
+
+        path = "/api/list_history?" + urlencode({"page": page, "pageSize": page_size})
+        return scenario, "POST", path, json.dumps(filters).encode()
+
+class LoadTestResult:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.started = 0.0
+        self.finished = 0.0
+
+    def record(self, scenario: str, latency: float, status: Optional[int]):
+        self.latencies[scenario].append(latency)
+        self.statuses[status if status is not None else "conn_error"] += 1
+        if status is None or status >= 400:
+            self.errors[scenario] += 1
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        duration = self.finished - self.started
+        all_latencies = [v for values in self.latencies.values() for v in values]
+
+        def stats(values: List[float], errors: int) -> dict:
+            return {
+                "requests": len(values),
+                "errors": errors,
+                "error_rate": round(errors / len(values), 4) if values else 0.0,
+                "rps": round(len(values) / duration, 1) if duration > 0 else 0.0,
+                "p50_ms": round(self.percentile(values, 50) * 1000, 1),
+                "p90_ms": round(self.percentile(values, 90) * 1000, 1),
+                "p95_ms": round(self.percentile(values, 95) * 1000, 1),
+                "p99_ms": round(self.percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1) if values else 0.0,
+            }
+
+        return {
+            "duration_s": round(duration, 2),
+            "overall": stats(all_latencies, sum(self.errors.values())),
+            "scenarios": {name: stats(values, self.errors[name]) for name, values in sorted(self.latencies.items())},
+            "statuses": {str(k): v for k, v in self.statuses.items()},
+        }
+
+async def run_load(host: str, port: int, generator: TrafficGenerator, concurrency: int,
+                   duration: float, warmup: float, timeout: float) -> LoadTestResult:
+    """以 concurrency 个并发连接持续发送请求，预热期内的结果不计入统计"""
+    result = LoadTestResult()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        conn = HttpConnection(host, port)
+        try:
+            while loop.time() < deadline:
+                scenario, method, path, body = generator.next_request()
+                sent = loop.time()
+                try:
+                    status, _ = await asyncio.wait_for(conn.request(method, path, body), timeout)
+                except Exception:
+                    status = None
+                    await conn.close()
+                if sent >= measure_from:
+                    result.record(scenario, loop.time() - sent, status)
+        finally:
+            await conn.close()
+
+    result.started = time.time() + warmup
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.finished = time.time()
+    return result
+
+def fetch_total_rows(host: str, port: int) -> int:
+    """查询目标服务器上的记录总数，用于确定深分页的页码范围"""
+    request = urllib.request.Request(
+        f"http://{host}:{port}/api/list_history?page=1&pageSize=1",
+        data=b"{}",
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)["total"]
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(home_dir: Path, port: int, maintenance: bool, search_index: bool) -> subprocess.Popen:
+    """以隔离的用户目录启动服务器（不开启自动重载），等待其就绪"""
+    app_data_dir = home_dir / "AppData" / "Local" / "BHB"
+    config = {
+        "db_path": str(app_data_dir / "history.db"),
+        "maintenance_enabled": maintenance,
+        "search_index_enabled": search_index
+    }
+    with open(app_data_dir / "config.json", 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+    env = dict(os.environ, HOME=str(home_dir), USERPROFILE=str(home_dir))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--no-access-log", "--log-level", "warning"],
+        cwd=str(ROOT_DIR), env=env
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("服务器启动失败")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/get_config", timeout=1)
+            return process
+        except Exception:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("等待服务器启动超时")
+
+def print_report(summary: dict, concurrency: int):
+    print()
+    print(f"📊 压测结果（并发 {concurrency}，统计时长 {summary['duration_s']} 秒）")
+    header = f"{'场景':<18}{'请求数':>8}{'RPS':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}{'错误率':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(summary["scenarios"].items()) + [("overall", summary["overall"])]
+    for name, s in rows:
+        print(f"{name:<18}{s['requests']:>8}{s['rps']:>9}{s['p50_ms']:>9}{s['p90_ms']:>9}"
+              f"{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}{s['error_rate'] * 100:>8.2f}%")
+    print("延迟单位: 毫秒；状态码分布:", summary["statuses"])
+
+def main():
+    """运行压测"""
+    parser = argparse.ArgumentParser(description="Browser History Browser 并发压测工具")
+    parser.add_argument("--url", help="压测已运行的服务器（如 http://127.0.0.1:8000），不指定则自动启动本地实例")
+    parser.add_argument("--rows", type=int, default=20000, help="生成的测试记录数（默认 20000）")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发连接数（默认 16）")
+    parser.add_argument("--duration", type=float, default=20, help="统计时长，秒（默认 20）")
+    parser.add_argument("--warmup", type=float, default=3, help="预热时长，秒（默认 3）")
+    parser.add_argument("--timeout", type=float, default=30, help="单个请求超时，秒（默认 30）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--maintenance", action="store_true", help="压测期间启用后台维护任务")
+    parser.add_argument("--no-search-index", dest="search_index", action="store_false",
+                        help="不建立三元组搜索索引（测量模糊/正则搜索的逐行校验路径）")
+    parser.add_argument("--custom-range-ratio", type=float, default=DEFAULT_CUSTOM_RANGE_RATIO,
+                        help=f"使用随机自定义时间范围（穿透服务端缓存）的请求比例，0~1（默认 {DEFAULT_CUSTOM_RANGE_RATIO}）")
+    parser.add_argument("--json", dest="json_path", help="同时将结果以 JSON 写入该文件")
+    args = parser.parse_args()
+
+    process = None
+    temp_dir = None
+    try:
+        if args.url:
+            parsed = urlparse(args.url)
+            host, port = parsed.hostname, parsed.port or 80
+            vocab = make_vocab(args.seed)
+            rows = fetch_total_rows(host, port)
+        else:
+            temp_dir = tempfile.TemporaryDirectory(prefix="bhb-loadtest-")
+            home_dir = Path(temp_dir.name)
+            app_data_dir = home_dir / "AppData" / "Local" / "BHB"
+            app_data_dir.mkdir(parents=True)
+            print(f"🛠️  生成测试数据库（{args.rows} 条记录）...")
+            vocab = generate_database(app_data_dir / "history.db", args.rows, args.seed, args.search_index)
+            rows = args.rows
+            host, port = "127.0.0.1", free_port()
+            print(f"🚀 启动服务器 http://{host}:{port}")
+            process = start_server(home_dir, port, args.maintenance, args.search_index)
+
+        print(f"⏱️  压测中：并发 {args.concurrency}，预热 {args.warmup} 秒，统计 {args.duration} 秒...")
+        generator = TrafficGenerator(vocab, rows, args.seed, args.custom_range_ratio)
+        result = asyncio.run(run_load(host, port, generator, args.concurrency,
+                                      args.duration, args.warmup, args.timeout))
+        summary = result.summary()
+        print_report(summary, args.concurrency)
+
+        if args.json_path:
+            with open(args.json_path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,40 @@
 
 const API_BASE = 'http://127.0.0.1:8000/api';
 
+// 滚动浏览：每次请求的窗口大小、可见区域外额外渲染的行数、最多缓存的窗口数（限制内存）
+const VIRTUAL_WINDOW_SIZE = 200;
+const VIRTUAL_OVERSCAN = 10;
+const VIRTUAL_MAX_WINDOWS = 10;
+// 滚动区域的最大高度（像素）。浏览器对元素高度有上限（Firefox 约 1790 万像素），
+// 记录数 × 行高超过该值时按比例把滚动位置映射到行号
+const VIRTUAL_MAX_HEIGHT = 8000000;
+
+const virtualState = {
+  windows: new Map(), // 窗口序号 -> 记录数组
+  pending: new Set(), // 正在请求的窗口序号
+  total: 0,
+  rowHeight: 46,
+  firstRow: 0, // 当前位于可见区域顶部的行号
+  generation: 0, // 过滤条件变化时递增，丢弃过期响应
+  lastScrollTop: 0,
+  direction: 'forward',
+  renderQueued: false
+};
+
+function loadViewMode() {
+  try {
+    return localStorage.getItem('viewMode') === 'virtual' ? 'virtual' : 'paged';
+  } catch (e) {
+    return 'paged';
+  }
+}
+
 const state = {
   page: 1,
   pageSize: 20,
   total: 0,
   keyword: '',
+  searchMode: 'plain', // 搜索模式: plain / fuzzy / regex
   timeRange: '7d',
   startDate: '',
   endDate: '',
@@ -15,6 +44,7 @@ const state = {
   items: [],
   sortBy: 'last_visited_time', // 默认按最后访问时间排序
   sortOrder: 'desc', // 默认降序
+  viewMode: loadViewMode(), // 列表模式: paged (分页) / virtual (滚动浏览)
   filtersVisible: false, // 过滤界面默认隐藏
   detailsVisible: false  // 详情界面默认隐藏
 };
@@ -41,25 +71,37 @@ async function fetchStats() {
   }
 }
 
+// 根据当前状态构建过滤器对象
+function buildFilters() {
+  const filters = {
+    keyword: state.keyword || null,
+    search_mode: state.searchMode,
+    locale: state.locale || null,
+    sort_by: state.sortBy || null,
+    sort_order: state.sortOrder || null
+  };
+
+  // 处理时间范围
+  if (state.timeRange === 'custom' && state.startDate && state.endDate) {
+    // 自定义日期范围，转换为时间戳范围
+    const startTs = Math.floor(new Date(state.startDate + 'T00:00:00').getTime() / 1000);
+    const endTs = Math.floor(new Date(state.endDate + 'T23:59:59').getTime() / 1000);
+    filters.time_range = `${startTs}-${endTs}`;
+  } else if (state.timeRange !== 'all') {
+    filters.time_range = state.timeRange;
+  }
+
+  return filters;
+}
+
 async function fetchList() {
+  if (state.viewMode === 'virtual') {
+    resetVirtualList();
+    return;
+  }
+
   try {
-    // 构建过滤器对象
-    const filters = {
-      keyword: state.keyword || null,
-      locale: state.locale || null,
-      sort_by: state.sortBy || null,
-      sort_order: state.sortOrder || null
-    };
-
-    // 处理时间范围
-    if (state.timeRange === 'custom' && state.startDate && state.endDate) {
-      // 自定义日期范围，转换为时间戳范围
-      const startTs = Math.floor(new Date(state.startDate + 'T00:00:00').getTime() / 1000);
-      const endTs = Math.floor(new Date(state.endDate + 'T23:59:59').getTime() / 1000);
-      filters.time_range = `${startTs}-${endTs}`;
-    } else if (state.timeRange !== 'all') {
-      filters.time_range = state.timeRange;
-    }
+    const filters = buildFilters();
 
     // console.log('发送过滤器:', filters); // 调试日志
 
@@ -71,6 +113,12 @@ async function fetchList() {
       body: JSON.stringify(filters)
     });
 
+    if (response.status === 400) {
+      // 参数错误（如无效的正则表达式）直接提示后端返回的原因
+      const err = await response.json();
+      showToast(err.detail || '搜索参数无效', 'error');
+      return;
+    }
     if (!response.ok) {
       throw new Error(`HTTP ${response.status}: ${response.statusText}`);
     }
@@ -86,6 +134,185 @@ async function fetchList() {
   }
 }
 
+// 滚动浏览：重置缓存并从第一行开始加载
+function resetVirtualList() {
+  virtualState.generation++;
+  virtualState.windows.clear();
+  virtualState.pending.clear();
+  virtualState.total = 0;
+  virtualState.firstRow = 0;
+  virtualState.lastScrollTop = 0;
+  virtualState.direction = 'forward';
+  document.getElementById('historyViewport').scrollTop = 0;
+  updateSortIndicators();
+  loadWindow(0);
+}
+
+async function loadWindow(index) {
+  if (virtualState.windows.has(index) || virtualState.pending.has(index)) return;
+  const generation = virtualState.generation;
+  virtualState.pending.add(index);
+
+  try {
+    const params = `anchor=${index * VIRTUAL_WINDOW_SIZE}&windowSize=${VIRTUAL_WINDOW_SIZE}&direction=${virtualState.direction}`;
+    const response = await fetch(`${API_BASE}/history_window?${params}`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(buildFilters())
+    });
+
+    if (response.status === 400) {
+      const err = await response.json();
+      showToast(err.detail || '搜索参数无效', 'error');
+      return;
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+
+    const res = await response.json();
+    if (generation !== virtualState.generation) return; // 过滤条件已变化
+
+    virtualState.windows.set(index, res.items);
+    virtualState.total = res.total;
+    evictWindows();
+    scheduleVirtualRender();
+  } catch (e) {
+    console.error('获取历史记录失败:', e);
+    showToast('获取历史记录失败', 'error');
+  } finally {
+    if (generation === virtualState.generation) {
+      virtualState.pending.delete(index);
+    }
+  }
+}
+
+// 只保留离当前可见位置最近的窗口，保证浏览器内存占用有上限
+function evictWindows() {
+  if (virtualState.windows.size <= VIRTUAL_MAX_WINDOWS) return;
+  const current = Math.floor(virtualState.firstRow / VIRTUAL_WINDOW_SIZE);
+  const indexes = [...virtualState.windows.keys()].sort((a, b) => Math.abs(b - current) - Math.abs(a - current));
+  while (virtualState.windows.size > VIRTUAL_MAX_WINDOWS) {
+    virtualState.windows.delete(indexes.shift());
+  }
+}
+
+function getVirtualItem(rowIndex) {
+  const items = virtualState.windows.get(Math.floor(rowIndex / VIRTUAL_WINDOW_SIZE));
+  return items ? items[rowIndex % VIRTUAL_WINDOW_SIZE] : undefined;
+}
+
+function scheduleVirtualRender() {
+  if (virtualState.renderQueued) return;
+  virtualState.renderQueued = true;
+  requestAnimationFrame(() => {
+    virtualState.renderQueued = false;
+    renderVirtualList();
+  });
+}
+
+function renderVirtualList() {
+  const viewport = document.getElementById('historyViewport');
+  const tbody = document.getElementById('historyTBody');
+  const { total, rowHeight } = virtualState;
+
+  // 表头吸顶显示，行的可见高度需扣除表头
+  const thead = viewport.querySelector('thead');
+  const viewHeight = Math.max(0, viewport.clientHeight - (thead ? thead.offsetHeight : 0));
+  const height = Math.min(total * rowHeight, VIRTUAL_MAX_HEIGHT);
+  const scrollTop = viewport.scrollTop;
+  const maxScroll = Math.max(0, height - viewHeight);
+  const scrollableRows = Math.max(0, total - viewHeight / rowHeight);
+  // 滚动条位置按比例映射为顶部行号（未超过高度上限时即 scrollTop / rowHeight）
+  const position = maxScroll > 0 ? Math.min(scrollTop, maxScroll) / maxScroll * scrollableRows : 0;
+  const first = Math.floor(position);
+  virtualState.firstRow = first;
+
+  const visibleCount = Math.ceil(viewHeight / rowHeight);
+  let start = Math.max(0, Math.min(first, total) - VIRTUAL_OVERSCAN);
+  const end = Math.min(total, first + visibleCount + VIRTUAL_OVERSCAN);
+
+  // 渲染块的顶部位置：使第 position 行恰好位于可见区域顶部；落在内容顶部之上的行不渲染
+  let top = scrollTop + (start - position) * rowHeight;
+  while (top < 0 && start < end) {
+    start++;
+    top += rowHeight;
+  }
+  top = Math.max(0, top);
+  const bottom = Math.max(0, height - top - (end - start) * rowHeight);
+
+  // 确保可见范围内的窗口已加载（服务端会继续预取滚动方向上的下一个窗口）
+  if (end > start) {
+    const firstWindow = Math.floor(start / VIRTUAL_WINDOW_SIZE);
+    const lastWindow = Math.floor((end - 1) / VIRTUAL_WINDOW_SIZE);
+    for (let w = firstWindow; w <= lastWindow; w++) {
+      loadWindow(w);
+    }
+  }
+
+  const rows = [`<tr class="virtual-spacer"><td colspan="4" style="height: ${top}px"></td></tr>`];
+  for (let i = start; i < end; i++) {
+    const item = getVirtualItem(i);
+    if (item) {
+      rows.push(`<tr class="virtual-row" data-index="${i}"><td>${escapeHtml(item.title || '')}</td><td>${escapeHtml(item.url || '')}</td><td>${fmtTime(item.last_visited_time)}</td><td>${item.num_visits}</td></tr>`);
+    } else {
+      rows.push('<tr class="virtual-row virtual-placeholder"><td colspan="4">加载中...</td></tr>');
+    }
+  }
+  rows.push(`<tr class="virtual-spacer"><td colspan="4" style="height: ${bottom}px"></td></tr>`);
+  tbody.innerHTML = rows.join('');
+
+  document.getElementById('virtualInfo').textContent = total > 0 ? `第 ${Math.min(first + 1, total)} 条，共 ${total} 条` : '无记录';
+
+  // 以实际渲染的行高为准（字体或缩放不同可能导致偏差）
+  const sampleRow = tbody.querySelector('tr.virtual-row');
+  if (sampleRow) {
+    const measured = sampleRow.getBoundingClientRect().height;
+    if (measured > 0 && Math.abs(measured - rowHeight) > 0.5) {
+      virtualState.rowHeight = measured;
+      scheduleVirtualRender();
+    }
+  }
+}
+
+function onVirtualScroll() {
+  if (state.viewMode !== 'virtual') return;
+  const scrollTop = document.getElementById('historyViewport').scrollTop;
+  virtualState.direction = scrollTop >= virtualState.lastScrollTop ? 'forward' : 'backward';
+  virtualState.lastScrollTop = scrollTop;
+  scheduleVirtualRender();
+}
+
+function applyViewMode() {
+  const historyList = document.querySelector('.history-list');
+  const viewModeBtn = document.getElementById('viewModeBtn');
+  if (state.viewMode === 'virtual') {
+    historyList.classList.add('virtual');
+    viewModeBtn.textContent = '📄 分页浏览';
+  } else {
+    historyList.classList.remove('virtual');
+    viewModeBtn.textContent = '📜 滚动浏览';
+    document.getElementById('virtualInfo').textContent = '';
+    // 离开滚动浏览时释放缓存的窗口
+    virtualState.generation++;
+    virtualState.windows.clear();
+    virtualState.pending.clear();
+  }
+}
+
+function toggleViewMode() {
+  state.viewMode = state.viewMode === 'virtual' ? 'paged' : 'virtual';
+  try {
+    localStorage.setItem('viewMode', state.viewMode);
+  } catch (e) {
+    console.warn('无法保存列表模式:', e);
+  }
+  applyViewMode();
+  fetchList();
+}
+
 function renderKpis(stats) {
   const kpis = document.getElementById('kpis');
   kpis.innerHTML = '';
@@ -392,6 +619,7 @@ window.addEventListener('keydown', e => { if (e.ctrlKey && e.key.toLowerCase() =
 
 document.getElementById('searchBtn').addEventListener('click', () => {
   state.keyword = document.getElementById('searchInput').value.trim();
+  state.searchMode = document.getElementById('searchMode').value;
   state.page = 1; fetchList();
 });
 
@@ -399,6 +627,7 @@ document.getElementById('searchInput').addEventListener('keydown', (e) => {
   if (e.key === 'Enter') {
     e.preventDefault();
     state.keyword = document.getElementById('searchInput').value.trim();
+    state.searchMode = document.getElementById('searchMode').value;
     state.page = 1; fetchList();
   }
 });
@@ -408,6 +637,7 @@ document.getElementById('applyFilters').addEventListener('click', () => {
   state.startDate = document.getElementById('startDate').value;
   state.endDate = document.getElementById('endDate').value;
   state.locale = document.getElementById('localeFilter').value.trim();
+  state.searchMode = document.getElementById('searchMode').value;
   state.page = 1;
   fetchStats();
   fetchList();
@@ -486,6 +716,20 @@ document.addEventListener('DOMContentLoaded', () => {
   updateLayout();
 });
 
+// 滚动浏览事件
+document.getElementById('viewModeBtn').addEventListener('click', toggleViewMode);
+document.getElementById('historyViewport').addEventListener('scroll', onVirtualScroll, { passive: true });
+window.addEventListener('resize', () => { if (state.viewMode === 'virtual') scheduleVirtualRender(); });
+
+// 滚动浏览模式下行是动态生成的，通过事件委托显示详情
+document.getElementById('historyTBody').addEventListener('click', (e) => {
+  if (state.viewMode !== 'virtual') return;
+  const tr = e.target.closest('tr.virtual-row[data-index]');
+  if (!tr) return;
+  const item = getVirtualItem(parseInt(tr.dataset.index));
+  if (item) showDetail(item);
+});
+
 // 过滤按钮事件
 document.getElementById('filterToggleBtn').addEventListener('click', toggleFilters);
 
@@ -516,4 +760,5 @@ async function initializeApp() {
 }
 
 // 启动应用
+applyViewMode();
 initializeApp();
\ No newline at end of file
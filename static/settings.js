@@ -17,6 +17,7 @@ const elements = {
   browseBrowserBtn: document.getElementById('browseBrowserBtn'),
   syncBtn: document.getElementById('syncBtn'),
   syncStatus: document.getElementById('syncStatus'),
+  cancelSyncBtn: document.getElementById('cancelSyncBtn'),
   // TOP站点数量配置相关元素
   topSitesCount: document.getElementById('topSitesCount'),
   applyTopSitesBtn: document.getElementById('applyTopSitesBtn')
@@ -39,7 +40,13 @@ async function apiCall(options) {
       body: data ? JSON.stringify(data) : null
     });
     if (!response.ok) {
-      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      let detail = response.statusText;
+      try {
+        detail = (await response.json()).detail || detail;
+      } catch (e) {
+        // 响应体不是 JSON 时使用状态文本
+      }
+      throw new Error(`HTTP ${response.status}: ${detail}`);
     }
     const result = await response.json();
     if (onSuccess) onSuccess(result);
@@ -60,6 +67,64 @@ async function apiCall(options) {
   }
 }
 
+// 启动后台任务并通过 SSE 订阅进度，任务结束后返回最终状态
+async function runJob(options) {
+  const { endpoint, data = null, button = null, onProgress = null } = options;
+
+  const job = await apiCall({ endpoint, data, method: 'POST', button });
+  if (button) button.disabled = true;
+
+  try {
+    return await new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_BASE}/jobs/${job.id}/events`);
+      source.onmessage = (event) => {
+        const status = JSON.parse(event.data);
+        if (onProgress) onProgress(status);
+        if (['completed', 'failed', 'cancelled'].includes(status.status)) {
+          source.close();
+          resolve(status);
+        }
+      };
+      source.onerror = () => {
+        source.close();
+        reject(new Error('进度连接中断'));
+      };
+    });
+  } finally {
+    if (button) button.disabled = false;
+  }
+}
+
+async function cancelJob(jobId) {
+  await apiCall({ endpoint: `/jobs/${jobId}/cancel`, method: 'POST' });
+}
+
+function formatBytes(bytes) {
+  if (bytes > 1024 * 1024 * 1024) return `${(bytes / (1024 * 1024 * 1024)).toFixed(1)} GB`;
+  if (bytes > 1024 * 1024) return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+  if (bytes > 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+  return `${bytes} 字节`;
+}
+
+// 生成进度描述：百分比、已处理量、吞吐和剩余时间
+function formatJobProgress(status) {
+  const parts = [];
+  if (status.bytes_total) {
+    const percent = Math.floor(status.bytes_done / status.bytes_total * 100);
+    parts.push(`${percent}% (${formatBytes(status.bytes_done)} / ${formatBytes(status.bytes_total)})`);
+  }
+  if (status.rows_total) {
+    parts.push(`${status.rows_processed} / ${status.rows_total} 项`);
+  }
+  if (status.throughput) {
+    parts.push(`${formatBytes(status.throughput)}/s`);
+  }
+  if (status.eta !== null && status.eta !== undefined) {
+    parts.push(`剩余约 ${Math.ceil(status.eta)} 秒`);
+  }
+  return parts.join('，');
+}
+
 function showToast(message, type = 'info') {
   // 移除已存在的提示
   const existingToast = document.querySelector('.toast');
@@ -221,6 +286,7 @@ elements.dbPath.addEventListener('input', updateButtons);
 // 新增的浏览器同步功能事件监听
 elements.browseBrowserBtn.addEventListener('click', browseBrowserFile);
 elements.syncBtn.addEventListener('click', syncBrowserDb);
+elements.cancelSyncBtn.addEventListener('click', cancelSync);
 elements.browserDbPath.addEventListener('input', updateSyncButtons);
 
 // TOP站点数量配置事件监听
@@ -322,31 +388,60 @@ function updateTopSitesButtons() {
 }
 
 // 同步浏览器数据库
+let activeSyncJobId = null;
+
 async function syncBrowserDb() {
   const browserPath = elements.browserDbPath.value.trim();
   if (!browserPath) return;
 
   updateSyncStatus('warning', '正在同步数据库...');
 
-  await apiCall({
-    endpoint: '/copy_browser_db_to_app', data: { browser_db_path: browserPath },
-    button: elements.syncBtn,
-    onSuccess: async (result) => {
-      const appDbPath = result.path;
+  try {
+    const status = await runJob({
+      endpoint: '/jobs/copy_browser_db', data: { browser_db_path: browserPath },
+      button: elements.syncBtn,
+      onProgress: (status) => {
+        activeSyncJobId = status.status === 'running' || status.status === 'pending' ? status.id : null;
+        elements.cancelSyncBtn.style.display = activeSyncJobId ? '' : 'none';
+        if (activeSyncJobId) {
+          updateSyncStatus('warning', `正在同步数据库... ${formatJobProgress(status)}`);
+        }
+      }
+    });
+
+    if (status.status === 'completed') {
       // 自动设置为当前数据库路径
-      elements.dbPath.value = appDbPath;
+      elements.dbPath.value = status.result.path;
       await applySettings();
       updateSyncStatus('ok', '同步成功');
       showToast('浏览器数据库同步成功!', 'success');
-    },
-    onError: (error) => {
-      updateSyncStatus('error', '同步失败: ' + error);
-      showToast('浏览器数据库同步失败: ' + error, 'error');
+    } else if (status.status === 'cancelled') {
+      updateSyncStatus('warning', '同步已取消');
+      showToast('浏览器数据库同步已取消', 'info');
+    } else {
+      updateSyncStatus('error', '同步失败: ' + status.error);
+      showToast('浏览器数据库同步失败: ' + status.error, 'error');
     }
-  });
+  } catch (error) {
+    updateSyncStatus('error', '同步失败: ' + error);
+    showToast('浏览器数据库同步失败: ' + error, 'error');
+  } finally {
+    activeSyncJobId = null;
+    elements.cancelSyncBtn.style.display = 'none';
+  }
   updateSyncButtons();
 }
 
+// 取消正在进行的同步
+async function cancelSync() {
+  if (!activeSyncJobId) return;
+  try {
+    await cancelJob(activeSyncJobId);
+  } catch (error) {
+    showToast('取消失败: ' + error, 'error');
+  }
+}
+
 // 打开数据库所在目录
 async function openDbDirectory() {
   await apiCall({endpoint: '/open_db_directory',
@@ -371,11 +466,25 @@ async function cleanupOldDbs() {
   const confirmed = confirm('确定要清理除当前使用外的所有.db文件吗？此操作不可撤销！');
   if (!confirmed) return;
 
-  await apiCall({endpoint: '/cleanup_old_dbs',
-    button: elements.cleanupBtn,
-    onSuccess: (result) => showToast(result.message || '清理完成', 'success'),
-    onError: (error) => showToast('清理失败: ' + error, 'error')
-  });
+  try {
+    const status = await runJob({
+      endpoint: '/jobs/cleanup_old_dbs',
+      button: elements.cleanupBtn,
+      onProgress: (status) => {
+        if (status.status === 'running') {
+          updateStatus('warning', `正在清理... ${formatJobProgress(status)}`);
+        }
+      }
+    });
+    updateStatus('ok', '已配置数据库路径');
+    if (status.status === 'completed') {
+      showToast(status.message || '清理完成', 'success');
+    } else {
+      showToast('清理失败: ' + (status.error || status.message), 'error');
+    }
+  } catch (error) {
+    showToast('清理失败: ' + error, 'error');
+  }
 
   updateButtons();
 }